@@ -0,0 +1,82 @@
+import srl
+from srl.base.env.singleplay_wrapper import SinglePlayEnvWrapper
+from srl.base.rl.base import RLConfig, RLParameter, RLRemoteMemory
+from srl.base.rl.singleplay_wrapper import SinglePlayWorkerWrapper
+from srl.runner import sequence
+
+# --- env & algorithm
+from srl.envs import grid  # isort: skip # noqa F401
+from srl.algorithms import ql  # isort: skip
+
+
+def _train(
+    env_config: srl.EnvConfig,
+    rl_config: RLConfig,
+    parameter: RLParameter,
+    remote_memory: RLRemoteMemory,
+    num_envs: int = 16,
+    max_episodes: int = 10000,
+):
+    # --- env と worker を num_envs 個作り、1stepずつ順番に進める
+    #     (worker/trainerの作成はエピソード毎ではなく最初の1回だけ)
+    envs = []
+    workers = []
+    for _ in range(num_envs):
+        env = srl.make_env(env_config)
+        worker = srl.make_worker(rl_config, parameter, remote_memory, training=True, distributed=False)
+
+        # --- change single play interface
+        envs.append(SinglePlayEnvWrapper(env))
+        workers.append(SinglePlayWorkerWrapper(worker))
+    trainer = srl.make_trainer(rl_config, parameter, remote_memory)
+
+    # 1. reset
+    for env, worker in zip(envs, workers):
+        env.reset()
+        worker.on_reset(env)
+
+    episode = 0
+    while True:
+        for env, worker in zip(envs, workers):
+            # 2. action
+            action = worker.policy(env)
+
+            # 3. step
+            env.step(action)
+            worker.on_step(env)
+
+            # 終了したenvだけ個別にresetする
+            if env.done:
+                if episode % 1000 == 0:
+                    print(f"{episode} / {max_episodes} episode, {env.step_num} step, {env.episode_rewards[0]} reward")
+                episode += 1
+                if episode >= max_episodes:
+                    return
+
+                env.reset()
+                worker.on_reset(env)
+
+        # 4. train (全envの1step分をまとめて学習)
+        trainer.train()
+
+
+def main():
+
+    env_config = srl.EnvConfig("Grid")
+    rl_config = ql.Config()
+
+    # rl init
+    rl_config.reset_config(srl.make_env(env_config))
+    parameter = srl.make_parameter(rl_config)
+    remote_memory = srl.make_remote_memory(rl_config)
+
+    # --- train loop
+    _train(env_config, rl_config, parameter, remote_memory)
+
+    # --- evaluate
+    rewards = sequence.evaluate(sequence.Config(env_config, rl_config), parameter, max_episodes=100)
+    print(f"evaluate: {sum(rewards) / len(rewards)} reward")
+
+
+if __name__ == "__main__":
+    main()
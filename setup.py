@@ -26,6 +26,8 @@ extras = {
         "kaggle_environments",
         "psutil",  # CPU info
         "pynvml",  # GPU info
+        "sortedcontainers",  # RankBaseMemoryLinear
+        "numba",  # Rendering (RL input image conversion)
     ],
 }
 # extras["all"] = list(set(itertools.chain.from_iterable([arr for arr in extras.values()])))
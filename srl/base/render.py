@@ -4,7 +4,7 @@ from typing import Optional, Union
 
 import numpy as np
 from srl.base.define import PlayRenderMode, RenderMode
-from srl.utils.render_functions import print_to_text, text_to_rgb_array
+from srl.utils.render_functions import cached_text_to_rgb_array, print_to_text
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +35,7 @@ class Render:
 
         self.fig = None
         self.ax = None
+        self.im = None
         self.screen = None
 
         self.print_str = ""
@@ -90,7 +91,7 @@ class Render:
             text = print_to_text(lambda: self.render_obj.render_terminal(**kwargs))
             if text == "":
                 return np.zeros((4, 4, 3), dtype=np.uint8)  # dummy
-            self.rgb_array = text_to_rgb_array(text, self.font_name, self.font_size)
+            self.rgb_array = cached_text_to_rgb_array(text, self.font_name, self.font_size)
         return self.rgb_array.astype(np.uint8)
 
     def render_window(self, **kwargs) -> np.ndarray:
@@ -105,17 +106,24 @@ class Render:
             self.ax.axis("off")
 
             if self.interval > 0:
-                self.t0 = time.time() - self.interval
+                self.t0 = time.time() - self.interval / 1000
 
-        # interval たっていない場合は待つ
+        # interval(ms) たっていない場合は待つ
         if self.interval > 0:
             elapsed_time = time.time() - self.t0
-            if elapsed_time < self.interval:
-                time.sleep((self.interval - elapsed_time) / 1000)
+            interval = self.interval / 1000
+            if elapsed_time < interval:
+                time.sleep(interval - elapsed_time)
             self.t0 = time.time()
 
-        self.ax.imshow(rgb_array)
-        self.fig.canvas.draw()
+        # 画像のartistは使いまわして中身だけ更新する(サイズが変わった場合は作り直す)
+        if self.im is None or self.im.get_array().shape != rgb_array.shape:
+            if self.im is not None:
+                self.im.remove()
+            self.im = self.ax.imshow(rgb_array)
+        else:
+            self.im.set_data(rgb_array)
+        self.fig.canvas.draw_idle()
         self.fig.canvas.flush_events()
 
         return rgb_array
@@ -1,9 +1,12 @@
+import functools
 import logging
-import pickle
+import multiprocessing as mp
 import random
 import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
-from typing import Any, List, Optional, Tuple, cast
+from typing import Any, List, Optional, Sequence, Tuple, cast
 
 import numpy as np
 from srl.base.define import EnvAction, EnvObservationType, RLObservationType
@@ -34,6 +37,193 @@ register(
 )
 
 
+# 8方向 (x, y)
+_DIRS = (
+    (-1, 1),
+    (0, 1),
+    (1, 1),
+    (1, 0),
+    (1, -1),
+    (0, -1),
+    (-1, -1),
+    (-1, 0),
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _create_shift_table(W: int, H: int) -> Tuple[Tuple[int, int], ...]:
+    """各方向へのbitシフト量と、はみ出しを消すmaskを作成
+
+    pos = W * y + x のbitに石があるとして、
+    shift > 0 なら左シフト、shift < 0 なら右シフトで隣のマスに移動する
+    盤面サイズ毎に1回だけ作成してインスタンス間で共有する
+    """
+    full_mask = (1 << (W * H)) - 1
+    not_left_mask = full_mask  # x=0 の列を除く
+    not_right_mask = full_mask  # x=W-1 の列を除く
+    for y in range(H):
+        not_left_mask &= ~(1 << (W * y))
+        not_right_mask &= ~(1 << (W * y + W - 1))
+
+    table = []
+    for diff_x, diff_y in _DIRS:
+        shift = diff_x + diff_y * W
+        if diff_x == 1:
+            mask = not_left_mask
+        elif diff_x == -1:
+            mask = not_right_mask
+        else:
+            mask = full_mask
+        table.append((shift, mask))
+    return tuple(table)
+
+
+def _gen_moves(me: int, opp: int, table: Sequence[Tuple[int, int]], full_mask: int, fill_num: int) -> int:
+    """meが石を置ける場所をbitで返す"""
+    # 呼び出し回数が多いので _shift は展開して書いている
+    empty = ~(me | opp) & full_mask
+    moves = 0
+    for shift, mask in table:
+        # 隣が相手の石で、その先に連続する相手の石を伸ばす
+        # 相手の石の先が空白なら置ける
+        if shift > 0:
+            t = (me << shift) & mask & opp
+            for _ in range(fill_num):
+                t |= (t << shift) & mask & opp
+            moves |= (t << shift) & mask & empty
+        else:
+            shift = -shift
+            t = (me >> shift) & mask & opp
+            for _ in range(fill_num):
+                t |= (t >> shift) & mask & opp
+            moves |= (t >> shift) & mask & empty
+    return moves
+
+
+def _flip(action: int, me: int, opp: int, table: Sequence[Tuple[int, int]]) -> int:
+    """actionに置いたときにひっくり返る石をbitで返す"""
+    flips = 0
+    bit = 1 << action
+    for shift, mask in table:
+        f = 0
+        if shift > 0:
+            t = (bit << shift) & mask
+            while t & opp:
+                f |= t
+                t = (t << shift) & mask
+        else:
+            shift = -shift
+            t = (bit >> shift) & mask
+            while t & opp:
+                f |= t
+                t = (t >> shift) & mask
+        # 相手の石の後に自分の石があるか
+        if t & me:
+            flips |= f
+    return flips
+
+
+def _popcount(b: int) -> int:
+    return bin(b).count("1")
+
+
+def _bits_to_array(b: int, size: int) -> np.ndarray:
+    arr = np.frombuffer(b.to_bytes((size + 7) // 8, "little"), dtype=np.uint8)
+    return np.unpackbits(arr, bitorder="little")[:size]
+
+
+@functools.lru_cache(maxsize=None)
+def _create_symmetry_table(W: int, H: int) -> Tuple[Tuple[Tuple[int, ...], ...], ...]:
+    """盤面の回転・反転の変換テーブルを作成
+    盤面サイズ毎に1回だけ作成して共有するので、結果は変更できない形で返す
+
+    Returns: luts[k][i][byte] がbitboardのi番目の8bitを変換kした結果
+    """
+    funcs = [
+        lambda x, y: (x, y),
+        lambda x, y: (W - 1 - x, y),
+        lambda x, y: (x, H - 1 - y),
+        lambda x, y: (W - 1 - x, H - 1 - y),
+    ]
+    if W == H:
+        # 正方形なら90度回転と対角反転も対称
+        funcs += [
+            lambda x, y: (y, x),
+            lambda x, y: (H - 1 - y, x),
+            lambda x, y: (y, W - 1 - x),
+            lambda x, y: (H - 1 - y, W - 1 - x),
+        ]
+
+    size = W * H
+    byte_num = (size + 7) // 8
+    luts = []
+    for f in funcs:
+        # perm[pos] が変換後のpos
+        perm = [0] * size
+        for y in range(H):
+            for x in range(W):
+                tx, ty = f(x, y)
+                perm[W * y + x] = W * ty + tx
+
+        # 8bit毎に変換後のbitを前計算しておく
+        lut = []
+        for i in range(byte_num):
+            t = [0] * 256
+            for v in range(1, 256):
+                low = v & -v
+                pos = i * 8 + low.bit_length() - 1
+                bit = (1 << perm[pos]) if pos < size else 0
+                t[v] = t[v & (v - 1)] | bit
+            lut.append(tuple(t))
+        luts.append(tuple(lut))
+
+    return tuple(luts)
+
+
+def _transform(b: int, lut: Sequence[Sequence[int]]) -> int:
+    t = 0
+    i = 0
+    while b:
+        t |= lut[i][b & 0xFF]
+        b >>= 8
+        i += 1
+    return t
+
+
+def _canonical(me: int, opp: int, luts: Sequence[Sequence[Sequence[int]]]) -> Tuple[int, int]:
+    """対称な盤面の中で最小となる (me, opp) を返す"""
+    best_key = (me, opp)
+    for k in range(1, len(luts)):
+        key = (_transform(me, luts[k]), _transform(opp, luts[k]))
+        if key < best_key:
+            best_key = key
+    return best_key
+
+
+def _create_eval_table(eval_field: List[int]) -> List[List[int]]:
+    """luts[i][byte] がbitboardのi番目の8bitに対する評価値の合計"""
+    size = len(eval_field)
+    luts = []
+    for i in range((size + 7) // 8):
+        t = [0] * 256
+        for v in range(1, 256):
+            low = v & -v
+            pos = i * 8 + low.bit_length() - 1
+            t[v] = t[v & (v - 1)] + (eval_field[pos] if pos < size else 0)
+        luts.append(t)
+    return luts
+
+
+def _evaluate(b: int, luts: List[List[int]]) -> int:
+    score = 0
+    i = 0
+    while b:
+        score += luts[i][b & 0xFF]
+        b >>= 8
+        i += 1
+    return score
+
+
 @dataclass
 class Othello(TurnBase2Player):
 
@@ -43,6 +233,13 @@ class Othello(TurnBase2Player):
     def __post_init__(self):
         self._player_index = 0
         self.screen = None
+        self._init_table()
+
+    def _init_table(self):
+        self._table_size = (self.W, self.H)
+        self._shift_table = _create_shift_table(self.W, self.H)
+        self._full_mask = (1 << (self.W * self.H)) - 1
+        self._fill_num = max(self.W, self.H) - 3
 
     def get_field(self, x: int, y: int) -> int:
         if x < 0:
@@ -53,10 +250,24 @@ class Othello(TurnBase2Player):
             return 9
         if y >= self.H:
             return 9
-        return self.field[self.W * y + x]
+        a = self.W * y + x
+        return ((self.black >> a) & 1) - ((self.white >> a) & 1)
 
     def set_field(self, x: int, y: int, n: int):
-        self.field[self.W * y + x] = n
+        bit = 1 << (self.W * y + x)
+        self.black &= ~bit
+        self.white &= ~bit
+        if n == 1:
+            self.black |= bit
+        elif n == -1:
+            self.white |= bit
+
+    def field_as_array(self) -> np.ndarray:
+        """1: player1(o), -1: player2(x), 0: 空白"""
+        size = self.W * self.H
+        black = _bits_to_array(self.black, size).astype(np.int8)
+        white = _bits_to_array(self.white, size).astype(np.int8)
+        return black - white
 
     def pos(self, x: int, y: int) -> int:
         return self.W * y + x
@@ -90,90 +301,78 @@ class Othello(TurnBase2Player):
         self.action = 0
 
         self._player_index = 0
-        self.field = [0] * (self.W * self.H)
+        if self._table_size != (self.W, self.H):
+            self._init_table()
+        self.black = 0
+        self.white = 0
         center_x = int(self.W / 2) - 1
         center_y = int(self.H / 2) - 1
         self.set_field(center_x, center_y, 1)
         self.set_field(center_x + 1, center_y + 1, 1)
         self.set_field(center_x + 1, center_y, -1)
         self.set_field(center_x, center_y + 1, -1)
-        self.movable_dirs = [
-            self._calc_movable_dirs(0),
-            self._calc_movable_dirs(1),
-        ]
+        self._update_movable()
 
-        return self.field, {}
+        return self.field_as_array().tolist(), {}
 
     def backup(self) -> Any:
-        return pickle.dumps(
-            [
-                self._player_index,
-                self.W,
-                self.H,
-                self.field,
-                self.movable_dirs,
-            ]
+        # 全て int なので pickle せずにそのまま tuple で保持する
+        return (
+            self._player_index,
+            self.W,
+            self.H,
+            self.black,
+            self.white,
+            self.movable[0],
+            self.movable[1],
         )
 
     def restore(self, data: Any) -> None:
-        d = pickle.loads(data)
-        self._player_index = d[0]
-        self.W = d[1]
-        self.H = d[2]
-        self.field = d[3]
-        self.movable_dirs = d[4]
-
-    def _calc_movable_dirs(self, player_index) -> List[List[int]]:
-        my_color = 1 if player_index == 0 else -1
-        enemy_color = -my_color
-
-        dirs_list = [[] for _ in range(self.W * self.H)]
-        for y in range(self.H):
-            for x in range(self.W):
-                # 石が置ける場所のみ
-                if self.get_field(x, y) != 0:
-                    continue
-
-                # (x, y, dir) dirはテンキーに対応
-                for diff_x, diff_y, dir_ in [
-                    (-1, 1, 1),
-                    (0, 1, 2),
-                    (1, 1, 3),
-                    (1, 0, 6),
-                    (1, -1, 9),
-                    (0, -1, 8),
-                    (-1, -1, 7),
-                    (-1, 0, 4),
-                ]:
-                    tmp_x = x + diff_x
-                    tmp_y = y + diff_y
-
-                    # 1つは相手の駒がある
-                    if self.get_field(tmp_x, tmp_y) != enemy_color:
-                        continue
-                    tmp_x += diff_x
-                    tmp_y += diff_y
-
-                    # 相手の駒移動
-                    while self.get_field(tmp_x, tmp_y) == enemy_color:
-                        tmp_x += diff_x
-                        tmp_y += diff_y
-
-                    # 相手の駒の後に自分の駒があるか
-                    if self.get_field(tmp_x, tmp_y) == my_color:
-                        dirs_list[self.pos(x, y)].append(dir_)
-
-        return dirs_list
+        (
+            self._player_index,
+            self.W,
+            self.H,
+            self.black,
+            self.white,
+            movable0,
+            movable1,
+        ) = data
+        self.movable = [movable0, movable1]
+        if self._table_size != (self.W, self.H):
+            self._init_table()
+
+    def _calc_movable(self, player_index: int) -> int:
+        if player_index == 0:
+            me, opp = self.black, self.white
+        else:
+            me, opp = self.white, self.black
+        return _gen_moves(me, opp, self._shift_table, self._full_mask, self._fill_num)
+
+    def _update_movable(self):
+        # 置ける場所は必要になった時に計算する (None は未計算)
+        self.movable = [None, None]
+
+    def _get_movable(self, player_index: int) -> int:
+        """player_index が置ける場所をbitで返す"""
+        movable = self.movable[player_index]
+        if movable is None:
+            movable = self._calc_movable(player_index)
+            self.movable[player_index] = movable
+        return movable
 
     def call_step(self, action: int) -> Tuple[List[int], float, float, bool, dict]:
         self.action = action
+        r1, r2, done, info = self._play(action)
+        return self.field_as_array().tolist(), r1, r2, done, info
 
+    def _play(self, action: int) -> Tuple[float, float, bool, dict]:
+        """call_stepから観測の作成を除いたもの (Cpuの探索では観測は使わないので直接呼ぶ)"""
         # --- error action
-        if len(self.movable_dirs[self.player_index][action]) == 0:
+        if not (self._get_movable(self.player_index) >> action) & 1:
             if self.player_index == 0:
-                return self.field, -1, 0, True, {}
+                return -1, 0, True, {}
             else:
-                return self.field, 0, -1, True, {}
+                return 0, -1, True, {}
 
         # --- step
         self._step(action)
@@ -181,88 +380,82 @@ class Othello(TurnBase2Player):
         # --- 終了判定
         enemy_player = 1 if self.player_index == 0 else 0
         my_player = 0 if self.player_index == 0 else 1
-        enemy_put_num = self.action_space.n - len(self.get_invalid_actions(enemy_player))
-        my_put_num = self.action_space.n - len(self.get_invalid_actions(my_player))
-        # 互いに置けないなら終了
-        if enemy_put_num == 0 and my_put_num == 0:
-            p1_count = len([f for f in self.field if f == 1])
-            p2_count = len([f for f in self.field if f == -1])
-            if p1_count > p2_count:
-                r1 = 1
-                r2 = -1
-            elif p1_count < p2_count:
-                r1 = -1
-                r2 = 1
-            else:
-                r1 = r2 = 0
-            return self.field, r1, r2, True, {"P1": p1_count, "P2": p2_count}
+        # 自分の置ける場所は相手が置けない場合のみ調べる
+        if self._get_movable(enemy_player) == 0:
+            # 互いに置けないなら終了
+            if self._get_movable(my_player) == 0:
+                p1_count = _popcount(self.black)
+                p2_count = _popcount(self.white)
+                if p1_count > p2_count:
+                    r1 = 1
+                    r2 = -1
+                elif p1_count < p2_count:
+                    r1 = -1
+                    r2 = 1
+                else:
+                    r1 = r2 = 0
+                return r1, r2, True, {"P1": p1_count, "P2": p2_count}
 
-        # 相手が置けないならpass
-        if enemy_put_num == 0:
-            return self.field, 0, 0, False, {}
+            # 相手が置けないならpass
+            return 0, 0, False, {}
 
         # 手番交代
         self._player_index = enemy_player
-        return self.field, 0, 0, False, {}
+        return 0, 0, False, {}
 
     def _step(self, action):
-
         # --- update
-        x, y = self.pos_decode(action)
-        my_color = 1 if self.player_index == 0 else -1
-        self.field[action] = my_color
-
-        # 移動方向はテンキー
-        move_diff = {
-            1: (-1, 1),
-            2: (0, 1),
-            3: (1, 1),
-            6: (1, 0),
-            9: (1, -1),
-            8: (0, -1),
-            7: (-1, -1),
-            4: (-1, 0),
-        }
-        for movable_dir in self.movable_dirs[self.player_index][action]:
-            diff_x, diff_y = move_diff[movable_dir]
-            tmp_x = x + diff_x
-            tmp_y = y + diff_y
-            while self.get_field(tmp_x, tmp_y) != my_color:
-                a = self.pos(tmp_x, tmp_y)
-                self.field[a] = my_color
-                tmp_x += diff_x
-                tmp_y += diff_y
+        bit = 1 << action
+        if self.player_index == 0:
+            flips = _flip(action, self.black, self.white, self._shift_table)
+            self.black |= bit | flips
+            self.white &= ~flips
+        else:
+            flips = _flip(action, self.white, self.black, self._shift_table)
+            self.white |= bit | flips
+            self.black &= ~flips
 
         # 置ける場所を更新
-        self.movable_dirs = [
-            self._calc_movable_dirs(0),
-            self._calc_movable_dirs(1),
-        ]
+        self._update_movable()
+
+    def get_valid_actions(self, player_index: int) -> List[int]:
+        # EnvBaseの実装(全マスをinvalid_actionsと比較)は使わずに、置ける場所のbitを直接indexにする
+        # (置ける場所は数個なので、numpyを使うより下位bitから順に取り出す方が速い)
+        movable = self._get_movable(player_index)
+        actions = []
+        while movable:
+            low = movable & -movable
+            actions.append(low.bit_length() - 1)
+            movable ^= low
+        return actions
 
     def get_invalid_actions(self, player_index) -> List[int]:
-        return [a for a in range(self.H * self.W) if len(self.movable_dirs[player_index][a]) == 0]
+        # 置けない場所のbitを立ててからまとめて index にする
+        invalid = ~self._get_movable(player_index) & self._full_mask
+        return np.flatnonzero(_bits_to_array(invalid, self.W * self.H)).tolist()
 
     def render_terminal(self, **kwargs) -> None:
-        invalid_actions = self.get_invalid_actions(self.player_index)
-        p1_count = len([f for f in self.field if f == 1])
-        p2_count = len([f for f in self.field if f == -1])
+        movable = self._get_movable(self.player_index)
+        p1_count = _popcount(self.black)
+        p2_count = _popcount(self.white)
+        field = self.field_as_array()
 
         print("-" * (1 + self.W * 3))
         for y in range(self.H):
             s = "|"
             for x in range(self.W):
                 a = self.pos(x, y)
-                if self.field[a] == 1:
+                if field[a] == 1:
                     if self.action == a:
                         s += "*o|"
                     else:
                         s += " o|"
-                elif self.field[a] == -1:
+                elif field[a] == -1:
                     if self.action == a:
                         s += "*x|"
                     else:
                         s += " x|"
-                elif a not in invalid_actions:
+                elif (movable >> a) & 1:
                     s += "{:2d}|".format(a)
                 else:
                     s += "  |"
@@ -286,7 +479,8 @@ class Othello(TurnBase2Player):
         h_margin = 10
         cell_w = int((WIDTH - w_margin * 2) / self.W)
         cell_h = int((HEIGHT - h_margin * 2) / self.H)
-        invalid_actions = self.get_invalid_actions(self.player_index)
+        movable = self._get_movable(self.player_index)
+        field = self.field_as_array()
 
         pw.draw_fill(self.screen, color=(255, 255, 255))
 
@@ -310,7 +504,7 @@ class Othello(TurnBase2Player):
                 )
 
                 a = x + y * self.W
-                if self.field[a] == 1:  # o
+                if field[a] == 1:  # o
                     if self.action == a:
                         width = 4
                         line_color = (200, 0, 0)
@@ -327,7 +521,7 @@ class Othello(TurnBase2Player):
                         width=width,
                         line_color=line_color,
                     )
-                elif self.field[a] == -1:  # x
+                elif field[a] == -1:  # x
                     if self.action == a:
                         width = 4
                         line_color = (200, 0, 0)
@@ -344,7 +538,7 @@ class Othello(TurnBase2Player):
                         width=width,
                         line_color=line_color,
                     )
-                elif a not in invalid_actions:
+                elif (movable >> a) & 1:
                     if self.player_index == 0:
                         color = (0, 0, 0)
                     else:
@@ -370,15 +564,60 @@ class Othello(TurnBase2Player):
         return None
 
 
+_INF = float("inf")
+
+# transposition table に保存する値の種類
+_EXACT = 0
+_LOWER = 1
+_UPPER = 2
+
+
+def _search_action(W: int, H: int, env_dat: Any, action: int, cache_capacity: int) -> Tuple[float, int]:
+    """プロセスプールで root の1手を探索する
+
+    盤面は backup の tuple (int のみ) で受け渡しする
+    Cpu.cache はプロセス毎に保持され、以降の呼び出しでも使われる
+    """
+    cpu = Cpu(cache_capacity)
+    cpu._setup(W, H)
+    cpu._count = 0
+    env = Othello(W, H)
+    env.restore(env_dat)
+    score = cpu._step_score(env, env.player_index, action, 0, -_INF, _INF)
+    return score, cpu._count
+
+
 class Cpu(RuleBaseWorker):
-    cache = {}
+    # 探索結果はエピソードやインスタンスをまたいで共有する (LRUで上限を超えたら古いものから削除)
+    cache = OrderedDict()
+
+    def __init__(self, cache_capacity: int = 100_000, num_workers: int = 0):
+        """
+        Args:
+            cache_capacity (int): 探索結果を保存する最大数
+            num_workers (int): 0より大きい場合、root の各手をプロセスプールで並列に探索する
+        """
+        super().__init__()
+        self.cache_capacity = cache_capacity
+        self.num_workers = num_workers
+        self._pool = None
+
+    def __del__(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
 
     def call_on_reset(self, _env: EnvRun, worker: WorkerRun) -> dict:
         env = cast(Othello, _env.get_original_env())
+        self._setup(env.W, env.H)
+        return {}
+
+    def _setup(self, W: int, H: int) -> None:
         self.max_depth = 2
         self.eval_field = None
 
-        if env.W == 8:
+        self._luts = _create_symmetry_table(W, H)
+
+        if W == 8:
             self.max_depth = 2
             self.eval_field = [
                 [30, -12, 0, -1, -1, 0, -12, 30],
@@ -390,10 +629,12 @@ class Cpu(RuleBaseWorker):
                 [-12, -15, -3, -3, -3, -3, -15, -12],
                 [30, -12, 0, -1, -1, 0, -12, 30],
             ]
-            self.eval_field = np.array(self.eval_field).flatten()
+            self.eval_field = np.array(self.eval_field, dtype=np.int16).flatten()
             assert self.eval_field.shape == (64,)
+            self._eval_list = self.eval_field.tolist()
+            self._eval_luts = _create_eval_table(self._eval_list)
 
-        elif env.W == 6:
+        elif W == 6:
             self.max_depth = 3
             self.eval_field = [
                 [30, -12, 0, 0, -12, 30],
@@ -403,18 +644,18 @@ class Cpu(RuleBaseWorker):
                 [-12, -15, -3, -3, -15, -12],
                 [30, -12, 0, 0, -12, 30],
             ]
-            self.eval_field = np.array(self.eval_field).flatten()
+            self.eval_field = np.array(self.eval_field, dtype=np.int16).flatten()
             assert self.eval_field.shape == (36,)
+            self._eval_list = self.eval_field.tolist()
+            self._eval_luts = _create_eval_table(self._eval_list)
 
-        elif env.W == 4:
+        elif W == 4:
             self.max_depth = 6
 
-        return {}
-
     def call_policy(self, env: EnvRun, worker: WorkerRun) -> Tuple[EnvAction, dict]:
         self._count = 0
         self.t0 = time.time()
-        scores = self._negamax(env.get_original_env().copy())
+        scores = self._search_root(env.get_original_env().copy())
         self._render_scores = scores
         self._render_count = self._count
         self._render_time = time.time() - self.t0
@@ -423,48 +664,113 @@ class Cpu(RuleBaseWorker):
         action = int(np.random.choice(np.where(scores == scores.max())[0]))
         return action, {}
 
-    def _negamax(self, env: Othello, depth: int = 0):
-
-        key = str(env.field)
-        if key in Cpu.cache:
-            return Cpu.cache[key]
-
-        self._count += 1
+    def _order_actions(self, env: Othello, player_index: int) -> List[int]:
+        valid_actions = env.get_valid_actions(player_index)
+        if self.eval_field is not None:
+            # 評価値の高い場所から探索すると枝刈りされやすい
+            valid_actions.sort(key=self._eval_list.__getitem__, reverse=True)
+        return valid_actions
+
+    def _step_score(self, env: Othello, player_index: int, action: int, depth: int, alpha: float, beta: float):
+        """action後の盤面の評価値を player_index から見た値で返す"""
+        r1, r2, done, _ = env._play(action)
+        if done:
+            # 終了状態なら報酬をスコアにする
+            if player_index == 0:
+                return r1 * 500
+            else:
+                return r2 * 500
+        elif depth > self.max_depth:
+            # 評価値を返す
+            if self.eval_field is None:
+                return 0
+            # 評価値は8bit毎の前計算テーブルから求める
+            score = _evaluate(env.black, self._eval_luts) - _evaluate(env.white, self._eval_luts)
+            if player_index != 0:
+                score = -score
+            return score
+        elif player_index != env.player_index:
+            return -self._negamax(env, depth + 1, -beta, -alpha)
+        else:
+            # パスで手番が変わらない
+            return self._negamax(env, depth + 1, alpha, beta)
 
-        env_dat = env.backup()
+    def _search_root(self, env: Othello) -> List[float]:
+        # 行動の選択と表示のために root は全ての手を正確な値で評価する
         player_index = env.player_index
-        valid_actions = env.get_valid_actions(player_index)
+        env_dat = env.backup()
 
         scores = [-999.0 for _ in range(env.action_space.n)]
-        for a in valid_actions:
+        if self.num_workers > 0:
+            if self._pool is None:
+                # tensorflow等と相性が悪いので spawn で作成する
+                self._pool = ProcessPoolExecutor(self.num_workers, mp_context=mp.get_context("spawn"))
+            futures = {
+                a: self._pool.submit(_search_action, env.W, env.H, env_dat, a, self.cache_capacity)
+                for a in self._order_actions(env, player_index)
+            }
+            for a, future in futures.items():
+                scores[a], count = future.result()
+                self._count += count
+            return scores
+
+        for a in self._order_actions(env, player_index):
             env.restore(env_dat)
+            scores[a] = self._step_score(env, player_index, a, 0, -_INF, _INF)
+        return scores
 
-            # env stepを実施
-            _, r1, r2, done, _ = env.call_step(a)
-            if done:
-                # 終了状態なら報酬をスコアにする
-                if player_index == 0:
-                    scores[a] = r1 * 500
-                else:
-                    scores[a] = r2 * 500
-            elif depth > self.max_depth:
-                # 評価値を返す
-                if self.eval_field is None:
-                    scores[a] = 0
-                else:
-                    scores[a] = np.sum(self.eval_field * env.field)
-                if player_index != 0:
-                    scores[a] = -scores[a]
-            else:
-                is_enemy = player_index != env.player_index
-                n_scores = self._negamax(env, depth + 1)
-                if is_enemy:
-                    scores[a] = -np.max(n_scores)
-                else:
-                    scores[a] = np.max(n_scores)
+    def _negamax(self, env: Othello, depth: int, alpha: float, beta: float) -> float:
+        player_index = env.player_index
 
-        Cpu.cache[key] = scores
-        return scores
+        # 手番側から見た盤面を対称性でまとめてキーにする
+        if player_index == 0:
+            board = _canonical(env.black, env.white, self._luts)
+        else:
+            board = _canonical(env.white, env.black, self._luts)
+        # 盤面サイズと残りの探索深さで結果が変わるのでキーに含める
+        key = (env.W, env.H, self.max_depth - depth) + board
+
+        # 枝刈りした結果は上限/下限としてしか使えないので種類も一緒に保存する
+        cache = self.cache
+        alpha_org = alpha
+        if key in cache:
+            cache.move_to_end(key)
+            value, flag = cache[key]
+            if flag == _EXACT:
+                return value
+            elif flag == _LOWER:
+                alpha = max(alpha, value)
+            elif flag == _UPPER:
+                beta = min(beta, value)
+            if alpha >= beta:
+                return value
+
+        self._count += 1
+
+        env_dat = env.backup()
+        best = -_INF
+        for a in self._order_actions(env, player_index):
+            env.restore(env_dat)
+            score = self._step_score(env, player_index, a, depth, alpha, beta)
+            if score > best:
+                best = score
+                if best > alpha:
+                    alpha = best
+                    if alpha >= beta:
+                        break
+
+        if best <= alpha_org:
+            flag = _UPPER
+        elif best >= beta:
+            flag = _LOWER
+        else:
+            flag = _EXACT
+
+        cache[key] = (best, flag)
+        cache.move_to_end(key)
+        while len(cache) > self.cache_capacity:
+            cache.popitem(last=False)
+        return best
 
     def render_terminal(self, _env: EnvRun, worker: WorkerRun, **kwargs) -> None:
         env = cast(Othello, _env.get_original_env())
@@ -510,12 +816,5 @@ class LayerProcessor(Processor):
         else:
             my_field = -1
             enemy_field = 1
-        _field = np.zeros((2, env.H, env.W))
-        for y in range(env.H):
-            for x in range(env.W):
-                idx = x + y * env.W
-                if observation[idx] == my_field:
-                    _field[0][y][x] = 1
-                elif observation[idx] == enemy_field:
-                    _field[1][y][x] = 1
-        return _field
+        observation = np.asarray(observation).reshape((env.H, env.W))
+        return np.stack([observation == my_field, observation == enemy_field]).astype(np.float32)
@@ -230,7 +230,8 @@ class OX(TurnBase2Player):
         return scores
 
     def _negamax(self, env: "OX") -> List[float]:
-        key = str(env.field)
+        # str() は遅いので tuple をキーにする
+        key = (tuple(env.field), env.player_index)
         if key in OX._scores_cache:
             return OX._scores_cache[key]
 
@@ -1,11 +1,10 @@
 import bisect
-import math
-import random
 from dataclasses import dataclass
 from typing import Any, List, Optional
 
 import numpy as np
 from srl.base.rl.memory import Memory
+from srl.utils.common import is_package_installed
 
 
 def rank_sum(k, a):
@@ -15,22 +14,10 @@ def rank_sum(k, a):
 def rank_sum_inverse(k, a):
     if a == 0:
         return k
-    t = a - 2 + math.sqrt((2 - a) ** 2 + 8 * a * k)
+    t = a - 2 + np.sqrt((2 - a) ** 2 + 8 * a * k)
     return t / (2 * a)
 
 
-class _bisect_wrapper:
-    def __init__(self, priority, batch):
-        self.priority = priority
-        self.batch = batch
-
-    def __lt__(self, o):  # a<b
-        return self.priority < o.priority
-
-
-# TODO: 赤黒木
-
-
 @dataclass
 class RankBaseMemoryLinear(Memory):
 
@@ -47,8 +34,24 @@ class RankBaseMemoryLinear(Memory):
         self.init()
 
     def init(self):
-        self.memory = []
+        # sortedcontainers があれば追加/削除が O(logN) の SortedList を使う
+        if is_package_installed("sortedcontainers"):
+            from sortedcontainers import SortedList
+
+            self.memory = SortedList()
+        else:
+            self.memory = []
         self.max_priority = 1
+        self._counter = 0
+
+    def _insort(self, priority: float, batch: Any):
+        # (priority, 追加順, batch) で保存し、同じpriorityは追加順で比較する(batchは比較しない)
+        self._counter += 1
+        o = (priority, self._counter, batch)
+        if isinstance(self.memory, list):
+            bisect.insort(self.memory, o)
+        else:
+            self.memory.add(o)
 
     def add(self, batch, td_error: Optional[float] = None):
         if td_error is None:
@@ -58,22 +61,20 @@ class RankBaseMemoryLinear(Memory):
             if self.max_priority < priority:
                 self.max_priority = priority
 
+        # 一番priorityが低いものを削除
         if len(self.memory) >= self.capacity:
             self.memory.pop(0)
 
-        bisect.insort(self.memory, _bisect_wrapper(priority, batch))
+        self._insort(priority, batch)
 
     def update(self, indices: List[int], batchs: List[Any], td_errors: np.ndarray) -> None:
         for i in range(len(batchs)):
             priority = float(abs(td_errors[i]))
             if self.max_priority < priority:
                 self.max_priority = priority
-            bisect.insort(self.memory, _bisect_wrapper(priority, batchs[i]))
+            self._insort(priority, batchs[i])
 
     def sample(self, batch_size, step):
-        batchs = []
-        weights = np.ones(batch_size, dtype=np.float32)
-
         # βは最初は低く、学習終わりに1にする。
         beta = self.beta_initial + (1 - self.beta_initial) * step / self.beta_steps
         if beta > 1:
@@ -84,29 +85,32 @@ class RankBaseMemoryLinear(Memory):
         total = rank_sum(memory_size, self.alpha)
 
         # index_list
-        index_list = []
-        for _ in range(batch_size):
-            for _ in range(9999):  # for safety
-                r = random.random() * total
-                index = rank_sum_inverse(r, self.alpha)
-                index = int(index)  # 整数にする(切り捨て)
-                if index not in index_list:
-                    index_list.append(index)
-                    break
-
-        index_list.sort(reverse=True)
-        for i, index in enumerate(index_list):
-            o = self.memory.pop(index)  # 後ろから取得するのでindexに変化なし
-            batchs.append(o.batch)
-
-            # 重点サンプリングを計算 w = (N * p)^-1
-            r1 = rank_sum(index + 1, self.alpha)
-            r2 = rank_sum(index, self.alpha)
-            prob = (r1 - r2) / total
-            weights[i] = (memory_size * prob) ** (-beta)
-
+        # まとめて乱数を引き、重複を除いて引いた順に batch_size 個とる
+        index_list = np.zeros(0, dtype=int)
+        for _ in range(9999):  # for safety
+            r = np.random.random(batch_size * 3) * total
+            indices = rank_sum_inverse(r, self.alpha).astype(int)  # 整数にする(切り捨て)
+            indices = np.minimum(indices, memory_size - 1)
+            indices = np.concatenate([index_list, indices])
+            _, first_idx = np.unique(indices, return_index=True)
+            index_list = indices[np.sort(first_idx)][:batch_size]
+            if len(index_list) >= batch_size:
+                break
+
+        # 重点サンプリングを計算 w = (N * p)^-1
+        index_list = np.sort(index_list)[::-1]
+        r1 = rank_sum(index_list + 1, self.alpha)
+        r2 = rank_sum(index_list, self.alpha)
+        prob = (r1 - r2) / total
+        weights = ((memory_size * prob) ** (-beta)).astype(np.float32)
         weights = weights / weights.max()
 
+        index_list = index_list.tolist()
+        batchs = []
+        for index in index_list:
+            _, _, batch = self.memory.pop(index)  # 後ろから取得するのでindexに変化なし
+            batchs.append(batch)
+
         return index_list, batchs, weights
 
     def __len__(self):
@@ -114,12 +118,16 @@ class RankBaseMemoryLinear(Memory):
 
     def backup(self):
         return [
-            [(d.priority, d.batch) for d in self.memory],
+            [(p, b) for p, _, b in self.memory],
             self.max_priority,
         ]
 
     def restore(self, data):
-        self.memory = []
-        for d in data[0]:
-            self.memory.append(_bisect_wrapper(d[0], d[1]))
+        self.init()
+        memory = [(d[0], i, d[1]) for i, d in enumerate(data[0])]
+        self._counter = len(memory)
+        if isinstance(self.memory, list):
+            self.memory.extend(memory)
+        else:
+            self.memory.update(memory)
         self.max_priority = data[1]
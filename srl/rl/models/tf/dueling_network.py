@@ -14,9 +14,12 @@ class DuelingNetworkBlock(keras.Model):
         activation: str = "relu",
         enable_noisy_dense: bool = False,
         enable_time_distributed_layer: bool = False,
+        enable_jit_compile: bool = False,
     ):
         super().__init__()
         self.dueling_type = dueling_type
+        self.enable_jit_compile = enable_jit_compile
+        self._call_fn = None
 
         if enable_noisy_dense:
             import tensorflow_addons as tfa
@@ -25,28 +28,28 @@ class DuelingNetworkBlock(keras.Model):
         else:
             _Dense = kl.Dense
 
+        # value と advance の中間層は入力が同じなので1つのDenseにまとめる
+        self.hidden = _Dense(dense_units * 2, activation=activation, kernel_initializer="he_normal")
+
         # value
-        self.v1 = _Dense(dense_units, activation=activation, kernel_initializer="he_normal")
-        self.v2 = _Dense(1, kernel_initializer="truncated_normal", bias_initializer="truncated_normal", name="v")
+        self.v = _Dense(1, kernel_initializer="truncated_normal", bias_initializer="truncated_normal", name="v")
 
         # advance
-        self.adv1 = _Dense(dense_units, activation=activation, kernel_initializer="he_normal")
-        self.adv2 = _Dense(
+        self.adv = _Dense(
             action_num, kernel_initializer="truncated_normal", bias_initializer="truncated_normal", name="adv"
         )
 
         self.enable_time_distributed_layer = enable_time_distributed_layer
         if enable_time_distributed_layer:
-            self.v1 = kl.TimeDistributed(self.v1)
-            self.v2 = kl.TimeDistributed(self.v2)
-            self.adv1 = kl.TimeDistributed(self.adv1)
-            self.adv2 = kl.TimeDistributed(self.adv2)
+            self.hidden = kl.TimeDistributed(self.hidden)
+            self.v = kl.TimeDistributed(self.v)
+            self.adv = kl.TimeDistributed(self.adv)
 
     def call(self, x, training=False):
-        v = self.v1(x, training=training)
-        v = self.v2(v, training=training)
-        adv = self.adv1(x, training=training)
-        adv = self.adv2(adv, training=training)
+        x = self.hidden(x, training=training)
+        v, adv = tf.split(x, 2, axis=-1)
+        v = self.v(v, training=training)
+        adv = self.adv(adv, training=training)
 
         if self.enable_time_distributed_layer:
             axis = 2
@@ -68,10 +71,17 @@ class DuelingNetworkBlock(keras.Model):
         self.__input_shape = input_shape
         super().build(self.__input_shape)
 
+        # shapeが決まった後にXLAでコンパイルする
+        # (training引数があるので input_signature は指定せずに tracing に任せる)
+        if self.enable_jit_compile and self._call_fn is None:
+            self._call_fn = tf.function(self.call, jit_compile=True)
+            self.call = self._call_fn
+
     def init_model_graph(self, name: str = ""):
         x = kl.Input(shape=self.__input_shape[1:])
         name = self.__class__.__name__ if name == "" else name
-        keras.Model(inputs=x, outputs=self.call(x), name=name)
+        # KerasTensor は tf.function に渡せないので元の call を使う
+        keras.Model(inputs=x, outputs=DuelingNetworkBlock.call(self, x), name=name)
 
 
 def create_dueling_network_layers(
@@ -94,12 +104,14 @@ def create_dueling_network_layers(
     else:
         _Dense = kl.Dense
 
+    # value と advance の中間層は入力が同じなので1つのDenseにまとめる
+    c = _Dense(dense_units * 2, activation=activation, kernel_initializer="he_normal")(c)
+    v, adv = tf.split(c, 2, axis=-1)
+
     # value
-    v = _Dense(dense_units, activation=activation, kernel_initializer="he_normal")(c)
     v = _Dense(1, kernel_initializer="truncated_normal", bias_initializer="truncated_normal", name="v")(v)
 
     # advance
-    adv = _Dense(dense_units, activation=activation, kernel_initializer="he_normal")(c)
     adv = _Dense(action_num, kernel_initializer="truncated_normal", bias_initializer="truncated_normal", name="adv")(
         adv
     )
@@ -1,26 +1,150 @@
+import functools
 import logging
+import os
+import tempfile
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from typing import List, Optional, Tuple, Union
 
 import numpy as np
 from srl.base.define import EnvObservationType, PlayRenderMode
 from srl.base.env.base import EnvRun
+from srl.base.env.spaces.box import BoxSpace
 from srl.base.rl.worker import RLWorker, WorkerRun
 from srl.runner.callback import Callback
 from srl.runner.config import Config
-from srl.utils.render_functions import text_to_rgb_array
+from srl.utils.common import is_package_installed
+from srl.utils.render_functions import cached_text_to_rgb_array, text_to_rgb_array
 
 logger = logging.getLogger(__name__)
 
 
+# 画像の周りの余白(px)
+_PADDING = 2
+
+
+def _info_text_to_rgb_array(text: str, spacing: int = 2) -> np.ndarray:
+    """1行目(step数を含むので毎回変わる)と2行目以降(env/workerのinfo)を別々に画像にする
+    2行目以降は同じ内容が続きやすいのでキャッシュを使う
+    """
+    header, _, body = text.partition("\n")
+    header_img = text_to_rgb_array(header)
+    if body == "":
+        return header_img
+    body_img = cached_text_to_rgb_array(body)
+
+    # 縦に連結(背景は黒)
+    h1, w1 = header_img.shape[:2]
+    h2, w2 = body_img.shape[:2]
+    img = np.zeros((h1 + spacing + h2, max(w1, w2), 3), dtype=np.uint8)
+    img[:h1, :w1] = header_img
+    img[h1 + spacing :, :w2] = body_img
+    return img
+
+
+@functools.lru_cache(maxsize=None)
+def _load_cv2():
+    """cv2のimportは毎フレーム行わずに初回のみ行う"""
+    import cv2
+
+    return cv2
+
+
+@functools.lru_cache(maxsize=None)
+def _get_scale_to_uint8_kernel():
+    """numbaがある場合、積/飽和/uint8変換を1パスで行う関数を作成(初回呼び出し時にJIT)"""
+    if not is_package_installed("numba"):
+        return None
+    import numba
+
+    @numba.njit(cache=True)
+    def _kernel(src, scale, out):
+        for i in range(src.size):
+            v = src[i] * scale
+            if v < 0:
+                v = 0
+            elif v > 255:
+                v = 255
+            out[i] = np.uint8(v)
+
+    return _kernel
+
+
+def _scale_to_uint8(src: np.ndarray, scale: float) -> np.ndarray:
+    """src*scaleをuint8に変換した新しい配列を返す
+    (framesに保持するのでバッファは使いまわさず毎回確保する)
+    """
+    out = np.empty(src.shape, dtype=np.uint8)
+    if np.issubdtype(src.dtype, np.floating):
+        # numpyと同じく元の型のまま計算する(float32の画像をfloat64で計算すると丸めが変わる)
+        scale = src.dtype.type(scale)
+    kernel = _get_scale_to_uint8_kernel()
+    if kernel is None:
+        np.multiply(src, scale, out=out, casting="unsafe")
+    else:
+        kernel(np.ascontiguousarray(src).reshape(-1), scale, out.reshape(-1))
+    return out
+
+
+@dataclass(frozen=True)
+class _DiskImage:
+    """一時ファイルに書き出した画像の位置"""
+
+    offset: int
+    shape: Tuple[int, ...]
+    dtype: str
+
+
+def _pack_rgb565(img: np.ndarray) -> np.ndarray:
+    """uint8のRGB画像(H,W,3)をRGB565(5-6-5bit)のuint16画像(H,W)にする"""
+    r = (img[..., 0] >> 3).astype(np.uint16)
+    g = (img[..., 1] >> 2).astype(np.uint16)
+    b = (img[..., 2] >> 3).astype(np.uint16)
+    return (r << 11) | (g << 5) | b
+
+
+def _unpack_rgb565(packed: np.ndarray) -> np.ndarray:
+    """RGB565のuint16画像(H,W)をuint8のRGB画像(H,W,3)に戻す
+    (下位bitは上位bitで埋めて、0-255の範囲を保つ)
+    """
+    img = np.empty(packed.shape + (3,), dtype=np.uint8)
+    r = (packed >> 11) & 0x1F
+    g = (packed >> 5) & 0x3F
+    b = packed & 0x1F
+    img[..., 0] = (r << 3) | (r >> 2)
+    img[..., 1] = (g << 2) | (g >> 4)
+    img[..., 2] = (b << 3) | (b >> 2)
+    return img
+
+
+@dataclass(frozen=True)
+class _RGB565Image:
+    """RGB565で保存した画像 (dataはnp.ndarrayか_DiskImage)"""
+
+    data: Union[np.ndarray, _DiskImage]
+
+
 @dataclass
 class Rendering(Callback):
 
     step_stop: bool = False
     use_skip_step: bool = True
+    # Trueの場合、フレームの画像をメモリに保持せず一時ファイルに書き出す
+    # (framesには画像の代わりに位置情報が入り、create_anime時に読み込まれる)
+    enable_disk_frames: bool = False
+    # Trueの場合、フレームのRGB画像をRGB565(2byte/pixel)に量子化して保持する
+    # (メモリ/ファイルサイズが2/3になる代わりに、色の下位bitが失われる)
+    enable_rgb565_frames: bool = False
+    # 1未満の場合、キャプチャ時に画像を縮小してから保持する
+    # (以降の保存/合成が全て縮小後の大きさで行われる)
+    capture_scale: float = 1.0
 
     def __post_init__(self):
         self.frames = []
+        self._frame_file = None
+        self._frame_mmap = None
+        self._prev_images = {}
         self.info_maxw = 0
         self.info_maxh = 0
         self.env_maxw = 0
@@ -37,12 +161,18 @@ class Rendering(Callback):
         self.rl_state_image = None
         self.render_interval = -1
         self.font = None
+        self._rl_img_scale = None  # 255: 0-1の画像, 1: 0-255の画像, 0: spaceから判定できない
+        self._action_text_cache = {}
 
     def on_episodes_begin(self, info) -> None:
         config: Config = info["config"]
         self.render_mode = config.render_mode
         self.render_kwargs = config.render_kwargs
         self.render_interval = info["env"].render_interval
+        self._rl_img_scale = None
+        self._action_text_cache = {}
+        if self.enable_disk_frames and self._frame_file is None:
+            self._frame_file = tempfile.TemporaryFile()
 
     def on_step_action_before(self, info) -> None:
         self._render_env(info)
@@ -71,31 +201,36 @@ class Rendering(Callback):
     def _render_env(self, info, skip_step=False):
         env: EnvRun = info["env"]
 
+        # --- render window (info textは使わないので作成しない)
+        if self.render_mode == PlayRenderMode.window:
+            env.render_window(**self.render_kwargs)
+            return
+        if self.render_mode not in [PlayRenderMode.terminal, PlayRenderMode.rgb_array]:
+            return
+
         # --- info text
-        action = info["action"] if "action" in info else "-"
-        step_time = info["step_time"] if "step_time" in info else None
+        action = info.get("action", "-")
+        step_time = info.get("step_time")
         worker_idx: int = info["worker_idx"]
         worker: WorkerRun = info["workers"][worker_idx]
-        info_text = f"### {env.step_num}"
-        if isinstance(action, float):
-            a1 = f"{action:.3f}"
-        else:
-            a1 = f"{action}"
-        a2 = env.action_to_str(action)
-        if a1 != a2:
-            action = f"{a1}({a2})"
-        info_text += f", action {action}"
-        info_text += ", rewards[" + ",".join([f"{r:.3f}," for r in env.step_rewards]) + "]"
+        action = self._action_to_text(env, action)
+        # 文字列の+=は毎回新しい文字列を作るので、listに追加して最後に1回だけjoinする
+        parts = [
+            f"### {env.step_num}",
+            f", action {action}",
+            ", rewards[" + ",".join([f"{r:.3f}" for r in env.step_rewards]) + "]",
+        ]
         if env.done:
-            info_text += f", done({env.done_reason})"
+            parts.append(f", done({env.done_reason})")
         if env.player_num > 1:
-            info_text += f", next {env.next_player_index}"
+            parts.append(f", next {env.next_player_index}")
         if skip_step:
-            info_text += "(skip frame)"
+            parts.append("(skip frame)")
         if step_time is not None:
-            info_text += f" ({step_time:.1f}s)"
-        info_text += f"\nenv   {env.info}"
-        info_text += f"\nwork{worker_idx: <2d}{worker.info}"
+            parts.append(f" ({step_time:.1f}s)")
+        parts.append(f"\nenv   {env.info}")
+        parts.append(f"\nwork{worker_idx: <2d}{worker.info}")
+        info_text = "".join(parts)
         self.info_text = info_text
 
         # --- render_terminal
@@ -105,33 +240,99 @@ class Rendering(Callback):
             # --- env text
             env.render_terminal(**self.render_kwargs)
 
-        # --- render window
-        if self.render_mode == PlayRenderMode.window:
-            env.render_window(**self.render_kwargs)
-
         if self.render_mode == PlayRenderMode.rgb_array:
-            self.env_img = env.render_rgb_array(**self.render_kwargs)
+            self.env_img = self._resize_captured_image(env.render_rgb_array(**self.render_kwargs))
             self.env_maxw = max(self.env_maxw, self.env_img.shape[1])
             self.env_maxh = max(self.env_maxh, self.env_img.shape[0])
 
+    def _action_to_text(self, env: EnvRun, action) -> str:
+        # int(離散)のactionは種類が少ないので、表示用の文字列をキャッシュする
+        is_int = type(action) is int
+        if is_int and action in self._action_text_cache:
+            return self._action_text_cache[action]
+
+        if isinstance(action, float):
+            a1 = f"{action:.3f}"
+        else:
+            a1 = f"{action}"
+        a2 = env.action_to_str(action)
+        text = a1 if a1 == a2 else f"{a1}({a2})"
+
+        if is_int and len(self._action_text_cache) < 64:
+            self._action_text_cache[action] = text
+        return text
+
     def _add_image(self):
 
         # --- rgb
         if self.render_mode == PlayRenderMode.rgb_array:
-            info_img = text_to_rgb_array(self.info_text)
+            info_img = _info_text_to_rgb_array(self.info_text)
             self.info_maxw = max(self.info_maxw, info_img.shape[1])
             self.info_maxh = max(self.info_maxh, info_img.shape[0])
 
             self.frames.append(
                 {
-                    "info_image": info_img,
-                    "env_image": self.env_img,
-                    "rl_image": self.rl_img,
-                    "rl_state_image": self.rl_state_image,
+                    "info_image": self._store_image_dedup("info_image", info_img),
+                    "env_image": self._store_image_dedup("env_image", self.env_img),
+                    "rl_image": self._store_image_dedup("rl_image", self.rl_img),
+                    "rl_state_image": self._store_image_dedup("rl_state_image", self.rl_state_image),
                 }
             )
 
+    def _store_image_dedup(
+        self, key: str, img: Optional[np.ndarray]
+    ) -> Union[None, np.ndarray, _DiskImage, _RGB565Image]:
+        """直前のフレームと同じ画像の場合は保存せずに直前のものを使いまわす
+        (フレーム数は変えずに、同じ画像がメモリ/ファイル上に重複しないようにする)
+        """
+        if img is None:
+            return None
+        prev = self._prev_images.get(key, None)
+        if prev is not None and prev[0].shape == img.shape and np.array_equal(prev[0], img):
+            return prev[1]
+        stored = self._store_image(img)
+        # 元の画像をそのまま保持しない場合(一時ファイル/RGB565)、元の画像は書き換えられる可能性があるので比較用にコピーを持つ
+        self._prev_images[key] = (img if stored is img else img.copy(), stored)
+        return stored
+
+    def _store_image(self, img: Optional[np.ndarray]) -> Union[None, np.ndarray, _DiskImage, _RGB565Image]:
+        if img is None:
+            return None
+        if self.enable_rgb565_frames and img.dtype == np.uint8 and img.ndim == 3 and img.shape[2] == 3:
+            return _RGB565Image(self._store_array(_pack_rgb565(img)))
+        return self._store_array(img)
+
+    def _store_array(self, img: np.ndarray) -> Union[np.ndarray, _DiskImage]:
+        if self._frame_file is None:
+            return img
+        img = np.ascontiguousarray(img)
+        self._frame_file.seek(0, 2)
+        offset = self._frame_file.tell()
+        self._frame_file.write(img.tobytes())
+        self._frame_mmap = None  # ファイルが伸びたので読み込み時に作り直す
+        return _DiskImage(offset, img.shape, img.dtype.str)
+
+    def _get_frame_mmap(self) -> np.memmap:
+        if self._frame_mmap is None:
+            self._frame_file.flush()
+            self._frame_mmap = np.memmap(self._frame_file, dtype=np.uint8, mode="r")
+        return self._frame_mmap
+
+    def _load_image(self, img: Union[None, np.ndarray, _DiskImage, _RGB565Image]) -> Optional[np.ndarray]:
+        if isinstance(img, _RGB565Image):
+            return _unpack_rgb565(self._load_array(img.data))
+        return self._load_array(img)
+
+    def _load_array(self, img: Union[None, np.ndarray, _DiskImage]) -> Optional[np.ndarray]:
+        if not isinstance(img, _DiskImage):
+            return img
+        dtype = np.dtype(img.dtype)
+        size = int(np.prod(img.shape)) * dtype.itemsize
+        return self._get_frame_mmap()[img.offset : img.offset + size].view(dtype).reshape(img.shape)
+
     def _render_worker(self, info):
+        if self.render_mode not in [PlayRenderMode.terminal, PlayRenderMode.rgb_array]:
+            return
         env: EnvRun = info["env"]
         worker_idx: int = info["worker_idx"]
         worker: WorkerRun = info["workers"][worker_idx]
@@ -142,7 +343,7 @@ class Rendering(Callback):
 
         # --- rgb
         if self.render_mode == PlayRenderMode.rgb_array:
-            self.rl_img = worker.render_rgb_array(env, **self.render_kwargs)
+            self.rl_img = self._resize_captured_image(worker.render_rgb_array(env, **self.render_kwargs))
             self.rl_maxw = max(self.rl_maxw, self.rl_img.shape[1])
             self.rl_maxh = max(self.rl_maxh, self.rl_img.shape[0])
 
@@ -150,85 +351,135 @@ class Rendering(Callback):
             if isinstance(worker.worker, RLWorker):
                 rl_worker: RLWorker = worker.worker
                 if EnvObservationType.is_image(rl_worker.config.env_observation_type):
+                    # uint8に変換 (255倍する場合はコピーせずに変換先へ直接書き込む、numbaがあれば飽和処理も同時に行う)
+                    src = rl_worker.recent_states[-1]
+                    scale = self._get_rl_img_scale(rl_worker, src)
+                    if scale != 1:
+                        _img = _scale_to_uint8(src, scale)
+                    else:
+                        # recent_statesの要素は毎step差し替えられる(書き換えられない)ので、
+                        # 元からuint8の場合はコピーせずにそのまま参照する
+                        _img = np.asarray(src, dtype=np.uint8)
+
                     # COLOR画像に変換
-                    _img = rl_worker.recent_states[-1].copy()
-                    if _img.max() <= 1:
-                        _img *= 255
+                    # (3chのコピーは作らずにstrideが0のviewにする、書き換えはできない)
                     if rl_worker.config.env_observation_type == EnvObservationType.GRAY_2ch:
-                        _img = _img[..., np.newaxis]
-                        _img = np.tile(_img, (1, 1, 3))
+                        _img = np.broadcast_to(_img[..., np.newaxis], _img.shape + (3,))
                     elif rl_worker.config.env_observation_type == EnvObservationType.GRAY_3ch:
-                        _img = np.tile(_img, (1, 1, 3))
-                    self.rl_state_image = _img.astype(np.uint8)
+                        _img = np.broadcast_to(_img, _img.shape[:2] + (3,))
+                    self.rl_state_image = self._resize_captured_image(_img)
                     self.rl_state_maxw = max(self.rl_state_maxw, self.rl_state_image.shape[1])
                     self.rl_state_maxh = max(self.rl_state_maxh, self.rl_state_image.shape[0])
 
-    # -----------------------------------------------
-    def _create_image(self, frame):
-        import cv2
+    def _get_rl_img_scale(self, rl_worker: RLWorker, src: np.ndarray) -> int:
+        """rlへの入力画像が0-1の場合は255倍する
+        画像の値は見ずにobservation spaceの上限で判定する (ImageProcessor(enable_norm=True)なら上限は1)
+        spaceから判定できない場合(BoxSpace以外、上限がない)のみ、毎回画像の最大値で判定する
+        """
+        if self._rl_img_scale is None:
+            space = rl_worker.config.observation_space
+            if isinstance(space, BoxSpace) and np.isfinite(space.high).all():
+                self._rl_img_scale = 255 if space.high.max() <= 1 else 1
+            else:
+                self._rl_img_scale = 0
+        if self._rl_img_scale != 0:
+            return self._rl_img_scale
+        return 255 if src.max() <= 1 else 1
 
-        info_image = frame["info_image"]
-        env_image = frame["env_image"]
-        rl_image = frame["rl_image"]
-        rl_state_image = frame["rl_state_image"]
+    def _resize_captured_image(self, img: np.ndarray) -> np.ndarray:
+        if self.capture_scale >= 1.0:
+            return img
+        cv2 = _load_cv2()
 
-        # --- 余白を追加
-        padding = 2
-        info_image = cv2.copyMakeBorder(
-            info_image, padding, padding, padding, padding, cv2.BORDER_CONSTANT, value=(0, 0, 0)
-        )
-        if rl_image is not None:
-            rl_image = cv2.copyMakeBorder(
-                rl_image, padding, padding, padding, padding, cv2.BORDER_CONSTANT, value=(0, 0, 0)
-            )
-        env_image = cv2.copyMakeBorder(
-            env_image, padding, padding, padding, padding, cv2.BORDER_CONSTANT, value=(255, 255, 255)
-        )
-        if rl_state_image is not None:
-            rl_state_image = cv2.copyMakeBorder(
-                rl_state_image, padding, padding, padding, padding, cv2.BORDER_CONSTANT, value=(255, 255, 255)
-            )
+        w = max(1, int(img.shape[1] * self.capture_scale))
+        h = max(1, int(img.shape[0] * self.capture_scale))
+        return cv2.resize(img, (w, h), interpolation=cv2.INTER_AREA)
 
-        # --- info + rl_image: 余白は右を埋める
+    # -----------------------------------------------
+    def _create_image(self, frame):
+        info_image = self._load_image(frame["info_image"])
+        env_image = self._load_image(frame["env_image"])
+        rl_image = self._load_image(frame["rl_image"])
+        rl_state_image = self._load_image(frame["rl_state_image"])
+
+        # 左: env + rl_state (背景は白)
+        # 右: info + rl_image (背景は黒)
+        # 各画像の周りに余白を付けて縦に並べ、列の幅は最大の画像に合わせる
+        # 最終的な大きさを先に計算し、1枚のcanvasに直接書き込む
+        padding = _PADDING
+        if rl_state_image is None:
+            left_w = env_image.shape[1] + padding * 2
+            left_maxh = self.env_maxh + padding * 2
+        else:
+            left_w = max(self.env_maxw, self.rl_state_maxw) + padding * 2
+            left_maxh = self.env_maxh + self.rl_state_maxh + padding * 4
         if rl_image is None:
-            right_img = info_image
+            right_w = info_image.shape[1] + padding * 2
             right_maxh = self.info_maxh + padding * 2
         else:
-            maxw = max(self.info_maxw + padding * 2, self.rl_maxw + padding * 2)
-            info_w = maxw - info_image.shape[1]
-            rl_w = maxw - rl_image.shape[1]
-            info_image = cv2.copyMakeBorder(info_image, 0, 0, 0, info_w, cv2.BORDER_CONSTANT, value=(0, 0, 0))
-            rl_image = cv2.copyMakeBorder(rl_image, 0, 0, 0, rl_w, cv2.BORDER_CONSTANT, value=(0, 0, 0))
-            right_img = cv2.vconcat([info_image, rl_image])  # 縦連結
+            right_w = max(self.info_maxw, self.rl_maxw) + padding * 2
             right_maxh = self.info_maxh + self.rl_maxh + padding * 4
+        maxh = max(left_maxh, right_maxh)
 
-        # --- env + rl_state:
-        if rl_state_image is None:
-            left_img = env_image
-            left_maxh = self.env_maxh + padding * 2
-        else:
-            maxw = max(self.env_maxw + padding * 2, self.rl_state_maxw + padding * 2)
-            env_w = maxw - env_image.shape[1]
-            rl_state_w = maxw - rl_state_image.shape[1]
-            env_image = cv2.copyMakeBorder(env_image, 0, 0, 0, env_w, cv2.BORDER_CONSTANT, value=(255, 255, 255))
-            rl_state_image = cv2.copyMakeBorder(
-                rl_state_image, 0, 0, 0, rl_state_w, cv2.BORDER_CONSTANT, value=(255, 255, 255)
-            )
-            left_img = cv2.vconcat([env_image, rl_state_image])  # 縦連結
-            left_maxh = self.env_maxh + self.rl_state_maxh + padding * 4
+        img = np.empty((maxh, left_w + right_w, 3), dtype=np.uint8)
+        img[:, :left_w] = 255
+        img[:, left_w:] = 0
 
-        # --- left_img + right_img: 余白は下を埋める
-        maxh = max(left_maxh, right_maxh)
-        left_h = maxh - left_img.shape[0]
-        right_h = maxh - right_img.shape[0]
-        left_img = cv2.copyMakeBorder(left_img, 0, left_h, 0, 0, cv2.BORDER_CONSTANT, value=(255, 255, 255))
-        right_img = cv2.copyMakeBorder(right_img, 0, right_h, 0, 0, cv2.BORDER_CONSTANT, value=(0, 0, 0))
-        img = cv2.hconcat([left_img, right_img])  # 横連結
+        def _paste(src, y, x):
+            h, w = src.shape[:2]
+            img[y + padding : y + padding + h, x + padding : x + padding + w] = src
+            return y + h + padding * 2
+
+        y = _paste(env_image, 0, 0)
+        if rl_state_image is not None:
+            _paste(rl_state_image, y, 0)
+        y = _paste(info_image, 0, left_w)
+        if rl_image is not None:
+            _paste(rl_image, y, left_w)
 
         return img
 
+    def _get_max_image_size(self, images: List[Tuple[np.ndarray, int]]) -> Tuple[int, int]:
+        """作成した画像の最大サイズ(w, h)"""
+        maxw = max(img.shape[1] for img, _ in images)
+        maxh = max(img.shape[0] for img, _ in images)
+        return maxw, maxh
+
     # -----------------------------------------------
 
+    def _create_frame_images(self, draw_info: bool) -> List[Tuple[np.ndarray, int]]:
+        """各フレームの画像を作成し、(画像, 連続数) のリストで返す"""
+        # 連続して同じ画像のフレームはまとめて、画像の作成を1回にする
+        # ([フレーム, 連続数] のリスト、画像は保存時に使いまわしているので同一オブジェクトかで判定できる)
+        if draw_info:
+            keys = ["info_image", "env_image", "rl_image", "rl_state_image"]
+        else:
+            keys = ["env_image"]
+        runs = []
+        for frame in self.frames:
+            if len(runs) > 0 and all(frame[k] is runs[-1][0][k] for k in keys):
+                runs[-1][1] += 1
+            else:
+                runs.append([frame, 1])
+
+        if draw_info:
+            # 合成はnumpyの処理(GILを解放する)が中心なのでスレッドで並列に作成する
+            # (mmapはスレッド間で共有するので先に作成しておく)
+            if self._frame_file is not None:
+                self._get_frame_mmap()
+            with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+                images = list(executor.map(self._create_image, [r[0] for r in runs]))
+        else:
+            images = [self._load_image(r[0]["env_image"]) for r in runs]
+        return [(img, r[1]) for img, r in zip(images, runs) if img is not None]
+
+    def _get_interval(self, interval: float) -> float:
+        if interval <= 0:
+            interval = self.render_interval
+        if interval <= 0:
+            interval = 1000 / 60
+        return interval
+
     def create_anime(
         self,
         scale: float = 1.0,
@@ -238,29 +489,16 @@ class Rendering(Callback):
         if len(self.frames) == 0:
             return None
         import matplotlib.pyplot as plt
-        from matplotlib.animation import ArtistAnimation
+        from matplotlib.animation import FuncAnimation
 
         t0 = time.time()
 
-        maxw = 0
-        maxh = 0
-        images = []
-        for f in self.frames:
-            if draw_info:
-                img = self._create_image(f)
-            else:
-                img = f["env_image"]
-            if img is None:
-                continue
-            images.append(img)
-            maxw = max(maxw, img.shape[1])
-            maxh = max(maxh, img.shape[0])
-
-        # --- interval
-        if interval <= 0:
-            interval = self.render_interval
-        if interval <= 0:
-            interval = 1000 / 60
+        images = self._create_frame_images(draw_info)
+        if len(images) == 0:
+            return None
+
+        maxw, maxh = self._get_max_image_size(images)
+        interval = self._get_interval(interval)
 
         # --- size (inch = pixel / dpi)
         fig_dpi = 100
@@ -269,29 +507,102 @@ class Rendering(Callback):
         )
 
         # --- animation
+        # artistは1つだけ作成し、フレーム毎に画像を差し替える
+        # (画像の大きさはフレーム毎に違う場合があるので、extentで左上に等倍で配置する)
         ax = fig.add_subplot(1, 1, 1)
         ax.axis("off")
-        images = [[ax.imshow(img, animated=True)] for img in images]
-        anime = ArtistAnimation(fig, images, interval=interval, repeat=False)
+        im = ax.imshow(images[0][0], animated=True)
+        ax.set_xlim(-0.5, maxw - 0.5)
+        ax.set_ylim(maxh - 0.5, -0.5)
+
+        def _update(img):
+            im.set_data(img)
+            im.set_extent((-0.5, img.shape[1] - 0.5, img.shape[0] - 0.5, -0.5))
+            return (im,)
+
+        frames = [img for img, n in images for _ in range(n)]
+        anime = FuncAnimation(fig, _update, frames=frames, interval=interval, blit=True, repeat=False)
         # plt.close(fig)  # notebook で画像が残るので出来ればcloseしたいけど、closeするとgym側でバグる
 
         logger.info(
-            f"animation created(frames: {len(self.frames)}, interval: {interval:.1f}ms, time {time.time() - t0:.1f}s)"
+            f"animation created(frames: {len(self.frames)}, unique frames: {len(images)}, "
+            f"interval: {interval:.1f}ms, time {time.time() - t0:.1f}s)"
         )
         return anime
 
+    def create_video(
+        self,
+        path: str,
+        scale: float = 1.0,
+        interval: float = -1,  # ms
+        draw_info: bool = False,
+        codec: str = "mp4v",
+    ) -> bool:
+        """matplotlibを使わずにcv2.VideoWriterで直接動画を作成する
+        (フレームは1枚ずつエンコーダに渡すので、長いepisodeでも高速でメモリも少ない)
+
+        codec: fourcc (例: "mp4v", ブラウザで再生する場合は "avc1"(mp4) や "VP80"(webm))
+        """
+        if len(self.frames) == 0:
+            return False
+        cv2 = _load_cv2()
+
+        t0 = time.time()
+
+        images = self._create_frame_images(draw_info)
+        if len(images) == 0:
+            return False
+
+        # 動画は全フレーム同じ大きさである必要があるので、最大サイズのcanvasの左上に配置する
+        maxw, maxh = self._get_max_image_size(images)
+        interval = self._get_interval(interval)
+        video_w = int(maxw * scale)
+        video_h = int(maxh * scale)
+
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*codec), 1000 / interval, (video_w, video_h))
+        if not writer.isOpened():
+            logger.warning(f"VideoWriter could not be opened(path: {path}, codec: {codec})")
+            return False
+        try:
+            for img, n in images:
+                canvas = np.zeros((maxh, maxw, 3), dtype=np.uint8)
+                canvas[: img.shape[0], : img.shape[1]] = img[:maxh, :maxw, :3]
+                if scale != 1.0:
+                    canvas = cv2.resize(canvas, (video_w, video_h))
+                canvas = cv2.cvtColor(canvas, cv2.COLOR_RGB2BGR)
+                for _ in range(n):
+                    writer.write(canvas)
+        finally:
+            writer.release()
+
+        logger.info(
+            f"video created(frames: {len(self.frames)}, interval: {interval:.1f}ms, time {time.time() - t0:.1f}s)"
+        )
+        return True
+
     def display(
         self,
         scale: float = 1.0,
         interval: float = -1,  # ms
         draw_info: bool = False,
+        use_video: bool = False,
     ) -> None:
+        """use_video=Trueの場合、jshtmlではなく動画(webm/VP8)にエンコードして表示する"""
         if len(self.frames) == 0:
             return
 
         from IPython import display
 
         t0 = time.time()
-        anime = self.create_anime(scale, interval, draw_info)
-        display.display(display.HTML(data=anime.to_jshtml()))
+        if use_video:
+            fd, path = tempfile.mkstemp(suffix=".webm")
+            os.close(fd)
+            try:
+                if self.create_video(path, scale, interval, draw_info, codec="VP80"):
+                    display.display(display.Video(path, embed=True))
+            finally:
+                os.remove(path)
+        else:
+            anime = self.create_anime(scale, interval, draw_info)
+            display.display(display.HTML(data=anime.to_jshtml()))
         logger.info("display created({:.1f}s)".format(time.time() - t0))
@@ -64,6 +64,9 @@ def play_facade(
     enable_rendering: bool = False,
     step_stop: bool = False,
     use_skip_step: bool = True,
+    enable_disk_frames: bool = False,
+    enable_rgb565_frames: bool = False,
+    capture_scale: float = 1.0,
     # other
     callbacks: List[Callback] = [],
     parameter: Optional[RLParameter] = None,
@@ -175,6 +178,9 @@ def play_facade(
         render = Rendering(
             step_stop=step_stop,
             use_skip_step=use_skip_step,
+            enable_disk_frames=enable_disk_frames,
+            enable_rgb565_frames=enable_rgb565_frames,
+            capture_scale=capture_scale,
         )
         config.callbacks.append(render)
     else:
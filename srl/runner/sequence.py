@@ -234,6 +234,9 @@ def animation(
     # Rendering
     render_kwargs: dict = {},
     use_skip_step: bool = True,
+    enable_disk_frames: bool = False,
+    enable_rgb565_frames: bool = False,
+    capture_scale: float = 1.0,
     # play config
     timeout: int = -1,
     max_steps: int = -1,
@@ -282,6 +285,9 @@ def animation(
         enable_rendering=True,
         step_stop=False,
         use_skip_step=use_skip_step,
+        enable_disk_frames=enable_disk_frames,
+        enable_rgb565_frames=enable_rgb565_frames,
+        capture_scale=capture_scale,
         # other
         callbacks=callbacks,
         parameter=parameter,
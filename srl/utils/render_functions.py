@@ -1,3 +1,4 @@
+import functools
 import io
 import logging
 import sys
@@ -31,14 +32,24 @@ def print_to_text(print_function: Callable[[], None]) -> str:
 _fonts = {}
 
 
+@functools.lru_cache(maxsize=None)
+def _load_pil():
+    """PILのimportとversionの判定は毎回行わずに初回のみ行う"""
+    import PIL
+    import PIL.Image
+    import PIL.ImageDraw
+    import PIL.ImageFont
+
+    use_textsize = compare_less_version(PIL.__version__, "9.2.0")
+    return PIL.Image, PIL.ImageDraw, PIL.ImageFont, use_textsize
+
+
 def text_to_rgb_array(
     text: str,
     font_name: str = "",
     font_size: int = 12,
 ) -> np.ndarray:
-    import PIL.Image
-    import PIL.ImageDraw
-    import PIL.ImageFont
+    Image, ImageDraw, ImageFont, use_textsize = _load_pil()
 
     global _fonts
 
@@ -47,17 +58,18 @@ def text_to_rgb_array(
 
     if font_name == "":
         font_name = get_font_path()
-    if font_name in _fonts:
-        font = _fonts[font_name]
+    font_key = f"{font_name}_{font_size}"
+    if font_key in _fonts:
+        font = _fonts[font_key]
     else:
-        logger.debug(f"load font: {font_name}")
-        font = PIL.ImageFont.truetype(font_name, size=font_size)
-        _fonts[font_name] = font
+        logger.debug(f"load font: {font_name}({font_size})")
+        font = ImageFont.truetype(font_name, size=font_size)
+        _fonts[font_key] = font
 
     canvas_size = (640, 480)
-    img = PIL.Image.new("RGB", canvas_size)
-    draw = PIL.ImageDraw.Draw(img)
-    if compare_less_version(PIL.__version__, "9.2.0"):
+    img = Image.new("RGB", canvas_size)
+    draw = ImageDraw.Draw(img)
+    if use_textsize:
         text_width, text_height = draw.multiline_textsize(text, font=font)
     else:
         _, _, text_width, text_height = draw.multiline_textbbox((0, 0), text, font=font)
@@ -65,9 +77,23 @@ def text_to_rgb_array(
     canvas_size = (text_width, text_height)
     background_rgb = (0, 0, 0)
     text_rgb = (255, 255, 255)
-    img = PIL.Image.new("RGB", canvas_size, background_rgb)
-    draw = PIL.ImageDraw.Draw(img)
+    img = Image.new("RGB", canvas_size, background_rgb)
+    draw = ImageDraw.Draw(img)
     draw.text((0, 0), text, fill=text_rgb, font=font)
     img = np.array(img).astype(np.uint8)
 
     return img
+
+
+@functools.lru_cache(maxsize=256)
+def cached_text_to_rgb_array(
+    text: str,
+    font_name: str = "",
+    font_size: int = 12,
+) -> np.ndarray:
+    """text_to_rgb_arrayの結果をキャッシュする版
+    同じ文字列の画像は使いまわすので書き換えできないようにする
+    """
+    img = text_to_rgb_array(text, font_name, font_size)
+    img.flags.writeable = False
+    return img
@@ -32,6 +32,22 @@ class Test(unittest.TestCase):
     def test_player4x4(self):
         self.tester.player_test("Othello4x4", "cpu")
 
+    def test_player_num_workers(self):
+        env_run = srl.make_env("Othello4x4")
+        env = cast(othello.Othello, env_run.get_original_env())
+        env_run.reset()
+        env_run.step(env.get_valid_actions(0)[0])
+
+        cpu = othello.Cpu()
+        cpu.call_on_reset(env_run, None)
+        cpu._count = 0
+        scores = cpu._search_root(env.copy())
+
+        cpu_mp = othello.Cpu(num_workers=2)
+        cpu_mp.call_on_reset(env_run, None)
+        cpu_mp._count = 0
+        self.assertTrue(cpu_mp._search_root(env.copy()) == scores)
+
     def test_processor(self):
         tester = TestProcessor()
         processor = othello.LayerProcessor()
@@ -82,14 +98,8 @@ class Test(unittest.TestCase):
         """
 
         # 初期配置で置ける場所
-        self.assertTrue(set(env.movable_dirs[0][34]) == set([6]))
-        self.assertTrue(set(env.movable_dirs[0][43]) == set([8]))
-        self.assertTrue(set(env.movable_dirs[0][20]) == set([2]))
-        self.assertTrue(set(env.movable_dirs[0][29]) == set([4]))
-        self.assertTrue(set(env.movable_dirs[1][19]) == set([2]))
-        self.assertTrue(set(env.movable_dirs[1][26]) == set([6]))
-        self.assertTrue(set(env.movable_dirs[1][37]) == set([4]))
-        self.assertTrue(set(env.movable_dirs[1][44]) == set([8]))
+        self.assertTrue(set(env.get_valid_actions(0)) == set([20, 29, 34, 43]))
+        self.assertTrue(set(env.get_valid_actions(1)) == set([19, 26, 37, 44]))
 
         env_run.step(34)
         env_run.render()
@@ -98,12 +108,8 @@ class Test(unittest.TestCase):
         self.assertTrue(env.get_field(3, 4) == 1)
         self.assertTrue(env.get_field(4, 4) == 1)
         self.assertTrue(env.get_field(5, 4) == 0)
-        self.assertTrue(set(env.movable_dirs[0][20]) == set([2]))
-        self.assertTrue(set(env.movable_dirs[0][21]) == set([1]))
-        self.assertTrue(set(env.movable_dirs[0][29]) == set([4]))
-        self.assertTrue(set(env.movable_dirs[1][26]) == set([6]))
-        self.assertTrue(set(env.movable_dirs[1][42]) == set([9]))
-        self.assertTrue(set(env.movable_dirs[1][44]) == set([8]))
+        self.assertTrue(set(env.get_valid_actions(0)) == set([20, 21, 29]))
+        self.assertTrue(set(env.get_valid_actions(1)) == set([26, 42, 44]))
 
         env_run.step(26)
         env_run.render()
@@ -112,11 +118,11 @@ class Test(unittest.TestCase):
         self.assertTrue(env.get_field(3, 3) == -1)
         self.assertTrue(env.get_field(4, 3) == -1)
         self.assertTrue(env.get_field(5, 3) == 0)
-        self.assertTrue(set(env.movable_dirs[0][17]) == set([3]))
-        self.assertTrue(set(env.movable_dirs[0][18]) == set([2, 3]))
-        self.assertTrue(set(env.movable_dirs[0][19]) == set([2]))
-        self.assertTrue(set(env.movable_dirs[0][20]) == set([1, 2]))
-        self.assertTrue(set(env.movable_dirs[0][21]) == set([1]))
+        self.assertTrue(set(env.get_valid_actions(0)) == set([17, 18, 19, 20, 21]))
+        self.assertTrue(set(env.get_valid_actions(1)) == set([41, 42, 43, 44, 45]))
+        for i in range(2):
+            invalid_actions = env.get_invalid_actions(i)
+            self.assertTrue(env.get_valid_actions(i) == [a for a in range(64) if a not in invalid_actions])
 
         env_run.step(21)
         env_run.step(29)
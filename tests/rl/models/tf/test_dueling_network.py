@@ -24,6 +24,23 @@ class Test(unittest.TestCase):
 
         self.assertTrue(out_x.shape == (batch_size, action_num))
 
+    def test_call_jit_compile(self):
+        action_num = 5
+        dense_units = 32
+        batch_size = 16
+
+        block = DuelingNetworkBlock(action_num, dense_units)
+        block_jit = DuelingNetworkBlock(action_num, dense_units, enable_jit_compile=True)
+
+        x = np.ones((batch_size, 128), dtype=np.float32)
+        block(x)
+        block_jit(x)
+        block_jit.set_weights(block.get_weights())
+
+        out_x = block_jit(x)
+        self.assertTrue(out_x.shape == (batch_size, action_num))
+        np.testing.assert_allclose(out_x.numpy(), block(x).numpy(), rtol=1e-5, atol=1e-5)
+
 
 if __name__ == "__main__":
     unittest.main(module=__name__, defaultTest="Test.test_call", verbosity=2)
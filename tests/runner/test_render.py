@@ -1,8 +1,13 @@
+import tempfile
 import unittest
+from unittest import mock
 
+import numpy as np
 import srl
+from srl.base.define import EnvObservationType
 from srl.envs import grid  # noqa E401
 from srl.runner import sequence
+from srl.runner.callback import Callback
 from srl.utils.common import is_package_installed, is_packages_installed
 
 
@@ -18,6 +23,85 @@ class Test(unittest.TestCase):
         render = sequence.animation(config, max_steps=10)
         render.create_anime(draw_info=True).save("tmp/b.gif")
 
+    def test_play_disk_frames(self):
+
+        config = sequence.Config(srl.EnvConfig("Grid"), None)
+        render = sequence.animation(config, max_steps=10, enable_disk_frames=True)
+        render.create_anime(draw_info=True).save("tmp/a_disk.gif")
+
+        # 同じフレームをメモリ上とファイル上に保存した場合で、作成される画像が同じか
+        from srl.runner.callbacks.rendering import _DiskImage, Rendering
+
+        config = sequence.Config(srl.EnvConfig("Grid"), None)
+        render = sequence.animation(config, max_steps=10)
+        disk_render = Rendering(enable_disk_frames=True)
+        disk_render._frame_file = tempfile.TemporaryFile()
+        for name in ["info", "env", "rl", "rl_state"]:
+            setattr(disk_render, f"{name}_maxw", getattr(render, f"{name}_maxw"))
+            setattr(disk_render, f"{name}_maxh", getattr(render, f"{name}_maxh"))
+        disk_render.frames = [{k: disk_render._store_image(v) for k, v in f.items()} for f in render.frames]
+        self.assertTrue(isinstance(disk_render.frames[0]["env_image"], _DiskImage))
+        for frame, disk_frame in zip(render.frames, disk_render.frames):
+            img = render._create_image(frame)
+            disk_img = disk_render._create_image(disk_frame)
+            self.assertTrue(img.shape == disk_img.shape)
+            self.assertTrue((img == disk_img).all())
+
+    def test_rgb565(self):
+        from srl.runner.callbacks.rendering import _pack_rgb565, _unpack_rgb565
+
+        x = np.random.randint(0, 256, (32, 48, 3), dtype=np.uint8)
+        packed = _pack_rgb565(x)
+        self.assertTrue(packed.dtype == np.uint16)
+        self.assertTrue(packed.shape == (32, 48))
+        y = _unpack_rgb565(packed)
+        self.assertTrue(y.dtype == np.uint8)
+        self.assertTrue(y.shape == x.shape)
+        self.assertTrue((np.abs(y.astype(int) - x.astype(int)) <= 7).all())
+
+        white = np.full((2, 2, 3), 255, dtype=np.uint8)
+        self.assertTrue((_unpack_rgb565(_pack_rgb565(white)) == 255).all())
+        black = np.zeros((2, 2, 3), dtype=np.uint8)
+        self.assertTrue((_unpack_rgb565(_pack_rgb565(black)) == 0).all())
+
+    def test_play_rgb565_frames(self):
+        from srl.runner.callbacks.rendering import _DiskImage, _RGB565Image
+
+        config = sequence.Config(srl.EnvConfig("Grid"), None)
+        render = sequence.animation(config, max_steps=10, enable_rgb565_frames=True)
+        self.assertTrue(isinstance(render.frames[0]["env_image"], _RGB565Image))
+        self.assertTrue(isinstance(render.frames[0]["info_image"], _RGB565Image))
+        self.assertTrue(render.frames[0]["env_image"].data.dtype == np.uint16)
+        env_img = render._load_image(render.frames[0]["env_image"])
+        self.assertTrue(env_img.dtype == np.uint8)
+        self.assertTrue(env_img.shape == (render.env_maxh, render.env_maxw, 3))
+        render.create_anime(draw_info=True).save("tmp/a_rgb565.gif")
+
+        config = sequence.Config(srl.EnvConfig("Grid"), None)
+        render = sequence.animation(config, max_steps=10, enable_disk_frames=True, enable_rgb565_frames=True)
+        self.assertTrue(isinstance(render.frames[0]["env_image"], _RGB565Image))
+        self.assertTrue(isinstance(render.frames[0]["env_image"].data, _DiskImage))
+        render.create_anime(draw_info=True).save("tmp/a_disk_rgb565.gif")
+
+    def test_play_capture_scale(self):
+
+        config = sequence.Config(srl.EnvConfig("Grid"), None)
+        render_full = sequence.animation(config, max_steps=10)
+
+        config = sequence.Config(srl.EnvConfig("Grid"), None)
+        render = sequence.animation(config, max_steps=10, capture_scale=0.5)
+        self.assertTrue(abs(render.env_maxw - render_full.env_maxw / 2) <= 1)
+        self.assertTrue(abs(render.env_maxh - render_full.env_maxh / 2) <= 1)
+        env_img = render._load_image(render.frames[0]["env_image"])
+        self.assertTrue(env_img.shape == (render.env_maxh, render.env_maxw, 3))
+        render.create_anime(draw_info=True).save("tmp/a_half.gif")
+
+    def test_play_video(self):
+
+        config = sequence.Config(srl.EnvConfig("Grid"), None)
+        render = sequence.animation(config, max_steps=10)
+        self.assertTrue(render.create_video("tmp/a.mp4", draw_info=True))
+
     @unittest.skipUnless(is_package_installed("gym"), "no module")
     def test_gym(self):
 
@@ -29,6 +113,75 @@ class Test(unittest.TestCase):
         render = sequence.animation(config, max_steps=10)
         render.create_anime(draw_info=True).save("tmp/d.gif")
 
+    def _play_rl_state_image(self, image_type: EnvObservationType, enable_norm: bool):
+        from srl.algorithms import dqn
+        from srl.base.rl.processors.image_processor import ImageProcessor
+        from srl.runner.callbacks.rendering import Rendering
+        from srl.runner.play_sequence import play_facade
+
+        class _Recorder(Callback):
+            def __init__(self, render: Rendering):
+                self.render = render
+                self.results = []
+
+            def on_step_begin(self, info) -> None:
+                # Renderingの後に呼ばれるので、同じstepのrlへの入力とその画像を記録する
+                worker = info["workers"][info["worker_idx"]].worker
+                self.results.append((worker.recent_states[-1].copy(), self.render.rl_state_image))
+
+        rl_config = dqn.Config()
+        rl_config.use_rl_processor = False
+        rl_config.change_observation_render_image = True
+        rl_config.processors = [ImageProcessor(image_type=image_type, resize=(32, 32), enable_norm=enable_norm)]
+        config = sequence.Config(srl.EnvConfig("Grid"), rl_config)
+        config.render_mode = "rgb_array"
+        render = Rendering()
+        recorder = _Recorder(render)
+        play_facade(
+            config,
+            max_steps=5,
+            disable_trainer=True,
+            render_mode="rgb_array",
+            print_progress=False,
+            enable_file_logger=False,
+            callbacks=[render, recorder],
+        )
+        return recorder.results
+
+    @unittest.skipUnless(is_package_installed("tensorflow"), "no module")
+    def test_rl_state_image(self):
+        from srl.runner.callbacks import rendering
+
+        for use_numba in [True, False]:
+            if use_numba and not is_package_installed("numba"):
+                continue
+            for image_type in [EnvObservationType.GRAY_2ch, EnvObservationType.GRAY_3ch, EnvObservationType.COLOR]:
+                for enable_norm in [True, False]:
+                    with self.subTest((use_numba, image_type, enable_norm)):
+                        if use_numba:
+                            results = self._play_rl_state_image(image_type, enable_norm)
+                        else:
+                            with mock.patch.object(rendering, "_get_scale_to_uint8_kernel", return_value=None):
+                                results = self._play_rl_state_image(image_type, enable_norm)
+                        self.assertTrue(len(results) > 0)
+
+                        for src, img in results:
+                            # 0-1の画像なら255倍、uint8に変換、3chにする
+                            true_img = src.copy()
+                            if enable_norm:
+                                self.assertTrue(true_img.max() <= 1)
+                                true_img *= 255
+                            if image_type == EnvObservationType.GRAY_2ch:
+                                true_img = np.tile(true_img[..., np.newaxis], (1, 1, 3))
+                            elif image_type == EnvObservationType.GRAY_3ch:
+                                true_img = np.tile(true_img, (1, 1, 3))
+                            true_img = true_img.astype(np.uint8)
+
+                            self.assertTrue(img.dtype == np.uint8)
+                            self.assertTrue(img.shape == true_img.shape)
+                            self.assertTrue(img.shape[2] == 3)
+                            self.assertTrue((img == true_img).all())
+
 
 if __name__ == "__main__":
     unittest.main(module=__name__, defaultTest="Test.test_play", verbosity=2)
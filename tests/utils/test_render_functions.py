@@ -2,7 +2,7 @@ import unittest
 
 import numpy as np
 from srl.utils.common import is_package_installed
-from srl.utils.render_functions import print_to_text, text_to_rgb_array
+from srl.utils.render_functions import cached_text_to_rgb_array, print_to_text, text_to_rgb_array
 
 
 class Test(unittest.TestCase):
@@ -38,6 +38,14 @@ class Test(unittest.TestCase):
                     img = Image.fromarray(rgb_array)
                     img.show()
 
+    @unittest.skipUnless(is_package_installed("PIL"), "no module")
+    def test_cached_text_to_rgb_array(self):
+        rgb_array = cached_text_to_rgb_array("StubRender\nAAA")
+        self.assertTrue((rgb_array == text_to_rgb_array("StubRender\nAAA")).all())
+        self.assertTrue(cached_text_to_rgb_array("StubRender\nAAA") is rgb_array)
+        self.assertFalse(rgb_array.flags.writeable)
+        self.assertFalse(cached_text_to_rgb_array("StubRender\nAAA", font_size=20) is rgb_array)
+
 
 if __name__ == "__main__":
     unittest.main(module=__name__, defaultTest="Test.test_text_to_rgb_array", verbosity=2)